@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import datetime as dt
 import re
+import io
 import os
 import seaborn as sns
 import matplotlib.pyplot as plt
@@ -31,16 +32,16 @@ st.set_page_config(
 # =============================================================================
 st.markdown("""
 <style>
-    /* Mengubah warna tabs */
-    button[data-baseweb="tab"][aria-selected="true"] {
-        color: #1877F2 !important;
+    /* Mengubah warna navigasi tab (radio) */
+    .st-key-active_tab label[data-baseweb="radio"]:has(input:checked) > div:first-child {
+        background-color: #1877F2 !important;
     }
             
-    div[data-baseweb="tab-highlight"] {
-        background-color: #1877F2 !important;
+    .st-key-active_tab label[data-baseweb="radio"]:has(input:checked) p {
+        color: #1877F2 !important;
     }
 
-    button[data-baseweb="tab"]:hover {
+    .st-key-active_tab label[data-baseweb="radio"]:hover p {
         color: #1877F2 !important;
     }
             
@@ -155,6 +156,15 @@ def process_data(df_sales_raw, df_ads_raw):
     
     return df_sales, df_ads
 
+# Urutan segmen dari Monetary terendah ke tertinggi
+SEGMENT_NAMES = [
+    'Hibernating / Low Value',
+    'New Customer',
+    'Potential Loyalist',
+    'Loyal Customer',
+    'Champion (VIP)'
+]
+
 # 3. HELPER FUNCTIONS UNTUK STRATEGI
 def get_mode(series):
     return series.mode().iloc[0] if not series.mode().empty else "Unknown"
@@ -167,6 +177,23 @@ def get_ads_insight(product_name, df_ads):
     else:
         return "All Ages (General)"
 
+def generate_strategy(row):
+    segmen = row['Segment_Name']
+    produk = row['product_clean']
+    kota = row['city']
+    umur = row['Target_Age_Ads']
+    
+    if "Champion" in segmen or ("Loyal" in segmen and "Potential" not in segmen):
+        return f"RETENTION & EXCLUSIVE UPSELLING: Tawarkan 'Exclusive Bundle' {produk}. Targetkan area {kota} (Umur {umur}). Fokus jaga loyalitas."
+    elif "Potential" in segmen:
+        return f"CROSS-SELLING: Tawarkan varian lain/paket bundling {produk} ke pelanggan di {kota}. Targetkan audiens {umur} untuk meningkatkan Frekuensi & Nilai Transaksi."
+    elif "New" in segmen:
+        return f"ACTIVATION: Dorong pembelian ke-2 (Repeat Order) untuk {produk}. Gunakan iklan testimoni di {kota} (Target {umur}). Fokus mendorong pembelian ulang."
+    elif "Hibernating" in segmen or "Low" in segmen:
+        return f"WIN-BACK (EFFICIENT): Beri diskon 'Hard Offer' waktu terbatas untuk {produk}. Fokus area {kota} saja untuk menghemat anggaran dan hentikan jika tidak memberikan dampak positif."
+    else:
+        return f"GENERAL: Optimalkan iklan {produk} di {kota}."
+
 # 4. HELPER FUNCTIONS UNTUK SCORECARDS
 def format_big_number(value):
     """
@@ -203,6 +230,347 @@ def show_about_modal():
     st.caption("© 2026 Universitas Komputer Indonesia (UNIKOM) - IF13")
     st.caption("Dibuat dengan **Python** & **Streamlit**")
 
+# 6. RFM & CLUSTERING (K-MEANS)
+@st.cache_data
+def compute_rfm_segments(df_sales_clean):
+    """
+    Menghitung RFM per pelanggan dan segmen K-Means.
+    Di-cache agar perpindahan tab tidak mengulang proses clustering.
+    """
+    # --- RFM CALCULATION ---
+    max_date = df_sales_clean['created_at'].max()
+    snapshot_date = max_date + dt.timedelta(days=1)
+    
+    df_rfm = df_sales_clean.groupby('name').agg({
+        'created_at': lambda x: (snapshot_date - x.max()).days,
+        'order_id': 'nunique', # Asumsi order_id unik per transaksi
+        'net_revenue': 'sum'
+    }).reset_index()
+    
+    df_rfm.rename(columns={'created_at': 'Recency', 'order_id': 'Frequency', 'net_revenue': 'Monetary'}, inplace=True)
+    
+    # --- CLUSTERING (K-MEANS) ---
+    # Scaling
+    scaler = StandardScaler()
+    rfm_scaled = scaler.fit_transform(df_rfm[['Recency', 'Frequency', 'Monetary']])
+    
+    # KMeans K=5
+    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
+    df_rfm['Cluster'] = kmeans.fit_predict(rfm_scaled)
+    
+    # Naming Segmen (Mapping berdasarkan urutan Monetary)
+    cluster_summary = df_rfm.groupby('Cluster')['Monetary'].mean().reset_index()
+    cluster_summary = cluster_summary.sort_values(by='Monetary', ascending=True).reset_index(drop=True)
+    
+    cluster_map = {row['Cluster']: SEGMENT_NAMES[i] for i, row in cluster_summary.iterrows()}
+    df_rfm['Segment_Name'] = df_rfm['Cluster'].map(cluster_map)
+
+    return df_rfm
+
+# 7. TRANSISI SEGMEN ANTAR PERIODE
+INACTIVE_SEGMENT = 'Tidak Aktif'
+
+@st.cache_data
+def compute_segment_transitions(df_sales, month_order):
+    """
+    Menghitung matriks perpindahan segmen pelanggan dari bulan ke bulan.
+    Seluruh bulan di-cluster sekali dengan satu set centroid K-Means yang sama,
+    sehingga label segmen konsisten antar periode. Hasil di-cache per versi data.
+    """
+    df_month = df_sales[df_sales['source_month'].isin(month_order)]
+
+    # RFM per (bulan, pelanggan) dengan snapshot = tanggal terakhir bulan tersebut + 1 hari
+    snapshot = df_month.groupby('source_month')['created_at'].transform('max') + dt.timedelta(days=1)
+    df_month = df_month.assign(days_since=(snapshot - df_month['created_at']).dt.days)
+
+    df_rfm_month = df_month.groupby(['source_month', 'name']).agg(
+        Recency=('days_since', 'min'),
+        Frequency=('order_id', 'nunique'),
+        Monetary=('net_revenue', 'sum')
+    ).reset_index()
+
+    if len(df_rfm_month) < len(SEGMENT_NAMES):
+        return {}
+
+    # Satu set centroid untuk semua bulan
+    scaler = StandardScaler()
+    rfm_scaled = scaler.fit_transform(df_rfm_month[['Recency', 'Frequency', 'Monetary']])
+    kmeans = KMeans(n_clusters=len(SEGMENT_NAMES), random_state=42, n_init=10)
+    df_rfm_month['Cluster'] = kmeans.fit_predict(rfm_scaled)
+
+    # Naming Segmen berdasarkan Monetary centroid (= rata-rata Monetary anggota cluster)
+    centroid_monetary = scaler.inverse_transform(kmeans.cluster_centers_)[:, 2]
+    cluster_map = dict(zip(np.argsort(centroid_monetary), SEGMENT_NAMES))
+    df_rfm_month['Segment_Name'] = df_rfm_month['Cluster'].map(cluster_map)
+
+    # Tabel lebar: 1 baris per pelanggan, 1 kolom per bulan
+    segment_wide = df_rfm_month.pivot(index='name', columns='source_month', values='Segment_Name')
+    segment_wide = segment_wide.reindex(columns=month_order).fillna(INACTIVE_SEGMENT)
+
+    state_order = SEGMENT_NAMES[::-1] + [INACTIVE_SEGMENT]
+    transitions = {}
+    for prev_month, next_month in zip(month_order[:-1], month_order[1:]):
+        # Abaikan pelanggan yang tidak aktif di kedua bulan pada pasangan ini
+        pair = segment_wide[[prev_month, next_month]]
+        pair = pair[(pair != INACTIVE_SEGMENT).any(axis=1)]
+        matrix = pd.crosstab(pair[prev_month], pair[next_month])
+        transitions[(prev_month, next_month)] = matrix.reindex(
+            index=state_order, columns=state_order, fill_value=0
+        )
+
+    return transitions
+
+# 8. KOMPUTASI PER TAB (LAZY)
+TAB_SUMMARY = "📊 **Executive Summary**"
+TAB_SEGMENT = "👥 **Segmentasi Pelanggan**"
+TAB_STRATEGY = "🎯 **Rekomendasi Strategi**"
+
+def persist_widget(widget_key):
+    """
+    Salin nilai widget ke key terpisah agar pilihan user tidak hilang saat tab lain dibuka.
+    """
+    st.session_state[f"saved_{widget_key}"] = st.session_state[widget_key]
+
+@st.cache_data
+def build_summary_view(df_sales_clean, df_ads_clean, pilihan_bulan):
+    """
+    Agregasi Tab Executive Summary. Hanya dipanggil saat tab tersebut dibuka
+    dan di-cache berdasarkan isi data, sehingga perpindahan tab memakai ulang hasilnya.
+    """
+    view = {}
+
+    # SCORECARDS
+    view['total_revenue'] = df_sales_clean['net_revenue'].sum()
+    view['total_orders'] = df_sales_clean['order_id'].nunique()
+    view['total_purchases_ads'] = df_ads_clean['Purchases'].sum()
+    view['conversion_rate'] = (view['total_orders'] / df_sales_clean['name'].nunique())
+
+    # TREN HARIAN
+    view['daily_revenue'] = df_sales_clean.groupby(df_sales_clean['created_at'].dt.date)['net_revenue'].sum().reset_index()
+
+    # Hitung Revenue per Produk & Kota, ambil 5 teratas
+    view['top_products'] = df_sales_clean.groupby('product_clean')['net_revenue'].sum().sort_values(ascending=False).head(5).reset_index()
+    view['top_cities'] = df_sales_clean.groupby('city')['net_revenue'].sum().sort_values(ascending=False).head(5).reset_index()
+
+    # TOP 3 BULANAN (Hanya jika filter Q3)
+    view['global_top_names'] = view['top_products']['product_clean'].tolist()
+    view['top3_per_month'] = {}
+    if pilihan_bulan == "Semua Data (Q3)":
+        for month in ['JULI', 'AGUSTUS', 'SEPTEMBER']:
+            df_month = df_sales_clean[df_sales_clean['source_month'] == month]
+            if not df_month.empty:
+                view['top3_per_month'][month] = df_month.groupby('product_clean')['net_revenue'].sum().sort_values(ascending=False).head(3).reset_index()
+
+    return view
+
+@st.cache_data
+def build_segment_view(df_rfm):
+    """Agregasi Tab Segmentasi: distribusi, revenue, dan repeat rate per segmen."""
+    view = {}
+
+    # Hitung Jumlah Customer per Segmen
+    seg_counts = df_rfm['Segment_Name'].value_counts().reset_index()
+    seg_counts.columns = ['Segment_Name', 'Jumlah Customer']
+
+    df_segment_view = seg_counts[['Segment_Name', 'Jumlah Customer']].copy()
+
+    view['df_segment_view'] = df_segment_view.rename(columns={
+        'Segment_Name': 'Segmen Pelanggan',
+        'Jumlah Customer': 'Total User'
+    })
+
+    # Label Horizontal Bar Chart
+    total_cust = seg_counts['Jumlah Customer'].sum()
+    seg_counts['Persentase'] = (seg_counts['Jumlah Customer'] / total_cust) * 100
+    seg_counts['Label'] = seg_counts.apply(lambda x: f"{x['Segment_Name']} ({x['Persentase']:.1f}%)", axis=1)
+    view['seg_counts'] = seg_counts
+
+    # --- REVENUE PER SEGMENT ---
+    rev_per_seg = df_rfm.groupby('Segment_Name')['Monetary'].sum().sort_values(ascending=False).reset_index()
+    view['rev_per_seg'] = rev_per_seg
+    view['top_seg_rev'] = rev_per_seg.iloc[0]['Segment_Name']
+
+    # --- REPEAT RATE PER SEGMENT ---
+    # 1. Hitung Repeat Rate (Frequency > 1) - Metode Vectorized
+    total_users = df_rfm.groupby('Segment_Name')['name'].count()
+    repeat_users = df_rfm[df_rfm['Frequency'] > 1].groupby('Segment_Name')['name'].count()
+
+    repeat_users = repeat_users.reindex(total_users.index, fill_value=0)
+
+    repeat_rate_series = (repeat_users / total_users) * 100
+    view['repeat_data'] = repeat_rate_series.reset_index(name='Repeat_Rate').sort_values(by='Repeat_Rate', ascending=False)
+
+    return view
+
+@st.cache_data
+def build_strategy_view(df_sales_clean, df_ads_clean, df_rfm):
+    """Agregasi Tab Rekomendasi Strategi: profil segmen, target usia iklan, dan strategi."""
+    # 1. Profiling Segmen
+    segment_counts_rfm = df_rfm['Segment_Name'].value_counts().reset_index()
+    segment_counts_rfm.columns = ['Segment_Name', 'Jumlah_Pelanggan']
+
+    df_final = df_sales_clean.merge(df_rfm[['name', 'Segment_Name']], on='name', how='left')
+
+    segment_profile = df_final.groupby('Segment_Name').agg({
+        'city': lambda x: get_mode(x),
+        'province': lambda x: get_mode(x),
+        'product_clean': lambda x: get_mode(x),
+        'net_revenue': 'mean'
+    }).reset_index()
+
+    segment_profile = segment_profile.merge(segment_counts_rfm, on='Segment_Name')
+
+    # 2. Cross-Match Ads Data
+    segment_profile['Target_Age_Ads'] = segment_profile['product_clean'].apply(
+        lambda x: get_ads_insight(x, df_ads_clean)
+    )
+
+    # 3. Generate Strategy
+    segment_profile['Strategi_Bisnis'] = segment_profile.apply(generate_strategy, axis=1)
+
+    return segment_profile
+
+# --- GRAFIK (DI-CACHE SEBAGAI PNG) ---
+def figure_to_png(fig):
+    """
+    Rasterisasi figure ke PNG bytes lalu tutup agar tidak menumpuk di memori pyplot.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+@st.cache_data
+def plot_daily_trend(daily_revenue):
+    """Grafik tren pendapatan harian (Tab Executive Summary)."""
+    fig_trend, ax_trend = plt.subplots(figsize=(10, 4))
+    sns.lineplot(data=daily_revenue, x='created_at', y='net_revenue', marker='o', ax=ax_trend, color='teal')
+    ax_trend.set_title("Daily Net Revenue")
+    ax_trend.set_xlabel("Tanggal")
+    ax_trend.set_ylabel("Revenue (Rp)")
+    ax_trend.tick_params(axis='x', rotation=45)
+    return figure_to_png(fig_trend)
+
+@st.cache_data
+def plot_top_revenue(top_data, label_col, palette):
+    """Bar chart Top 5 revenue per produk / kota (Tab Executive Summary)."""
+    fig_top, ax_top = plt.subplots(figsize=(6, 4))
+    sns.barplot(data=top_data, y=label_col, x='net_revenue', hue=label_col, legend=False, palette=palette, ax=ax_top)
+    ax_top.set_xlabel("Total Revenue (Rp)")
+    ax_top.set_ylabel("")
+    return figure_to_png(fig_top)
+
+@st.cache_data
+def plot_segment_distribution(seg_counts):
+    """Bar chart horizontal distribusi segmen (Tab Segmentasi)."""
+    fig_bar_seg, ax_bar_seg = plt.subplots(figsize=(6, 4))
+    fig_bar_seg.patch.set_alpha(0)
+    ax_bar_seg.patch.set_alpha(0)
+
+    # Plot Bar Chart Horizontal
+    sns.barplot(
+        data=seg_counts, 
+        y='Label',         
+        x='Jumlah Customer', 
+        hue='Label',
+        legend=False,
+        palette='viridis',  
+        ax=ax_bar_seg
+    )
+
+    for container in ax_bar_seg.containers:
+        ax_bar_seg.bar_label(container, padding=5, fmt='%d User', color='#333333')
+
+    # Bersihkan chart junk
+    sns.despine(ax=ax_bar_seg, left=True, bottom=True)
+    ax_bar_seg.set_xlabel("")
+    ax_bar_seg.set_ylabel("")
+    ax_bar_seg.set_xticks([])
+    return figure_to_png(fig_bar_seg)
+
+@st.cache_data
+def plot_segment_scatter(df_rfm):
+    """Scatter plot Recency vs Monetary seluruh pelanggan (Tab Segmentasi)."""
+    fig_scatter, ax_scatter = plt.subplots(figsize=(8, 6))
+    fig_scatter.patch.set_alpha(0)
+    ax_scatter.patch.set_alpha(0)
+    ax_scatter.tick_params(colors='#888888')
+    ax_scatter.xaxis.label.set_color('#888888')
+    ax_scatter.yaxis.label.set_color('#888888')
+    ax_scatter.title.set_color('#888888')
+
+    # Scatter Plot
+    sns.scatterplot(
+        data=df_rfm, 
+        x='Recency', 
+        y='Monetary', 
+        hue='Segment_Name', 
+        palette='viridis', 
+        s=100, 
+        ax=ax_scatter
+    )
+
+    ax_scatter.set_title("") 
+    ax_scatter.set_xlabel("Recency (Hari)")
+    ax_scatter.set_ylabel("Monetary (Rp)")
+    return figure_to_png(fig_scatter)
+
+@st.cache_data
+def plot_segment_revenue(rev_per_seg):
+    """Bar chart kontribusi revenue per segmen (Tab Segmentasi)."""
+    fig_rev, ax_rev = plt.subplots(figsize=(6, 4))
+    sns.barplot(
+        data=rev_per_seg,
+        y='Segment_Name',
+        x='Monetary',
+        hue='Segment_Name',
+        legend=False,
+        palette='Blues_r',
+        ax=ax_rev
+    )
+
+    ax_rev.set_xlabel("Total Revenue")
+    ax_rev.set_ylabel("")
+    sns.despine(ax=ax_rev, left=True, bottom=False)
+
+    def currency_fmt(x, pos):
+        return format_big_number(x)
+
+    ax_rev.xaxis.set_major_formatter(ticker.FuncFormatter(currency_fmt))
+    return figure_to_png(fig_rev)
+
+@st.cache_data
+def plot_repeat_rate(repeat_data):
+    """Bar chart persentase repeat order per segmen (Tab Segmentasi)."""
+    fig_rep, ax_rep = plt.subplots(figsize=(6, 4))
+    sns.barplot(
+        data=repeat_data,
+        y='Segment_Name',
+        x='Repeat_Rate',
+        hue='Segment_Name',
+        legend=False,
+        palette='Greens_r',
+        ax=ax_rep
+    )
+
+    for container in ax_rep.containers:
+        ax_rep.bar_label(container, fmt='%.1f%%', padding=3, fontsize=10)
+
+    ax_rep.set_xlabel("Persentase Repeat Order (%)")
+    ax_rep.set_ylabel("")
+    ax_rep.set_xlim(0, 115)
+    sns.despine(ax=ax_rep, left=True, bottom=False)
+    return figure_to_png(fig_rep)
+
+@st.cache_data
+def plot_transition_heatmap(matrix, prev_month, next_month):
+    """Heatmap migrasi segmen untuk satu pasangan bulan (Tab Segmentasi)."""
+    fig_trans, ax_trans = plt.subplots(figsize=(9, 5))
+    sns.heatmap(matrix, annot=True, fmt='d', cmap='Blues', cbar=False, linewidths=0.5, ax=ax_trans)
+    ax_trans.set_xlabel(f"Segmen {next_month}")
+    ax_trans.set_ylabel(f"Segmen {prev_month}")
+    return figure_to_png(fig_trans)
+
 # =============================================================================
 # MAIN APP UI
 # =============================================================================
@@ -271,58 +639,26 @@ df_sales_clean, df_ads_clean = process_data(df_sales_filtered, df_ads_filtered)
 
 if df_sales_clean is not None:
     
-    # --- RFM CALCULATION ---
-    max_date = df_sales_clean['created_at'].max()
-    snapshot_date = max_date + dt.timedelta(days=1)
-    
-    df_rfm = df_sales_clean.groupby('name').agg({
-        'created_at': lambda x: (snapshot_date - x.max()).days,
-        'order_id': 'nunique', # Asumsi order_id unik per transaksi
-        'net_revenue': 'sum'
-    }).reset_index()
-    
-    df_rfm.rename(columns={'created_at': 'Recency', 'order_id': 'Frequency', 'net_revenue': 'Monetary'}, inplace=True)
-    
-    # --- CLUSTERING (K-MEANS) ---
-    # Scaling
-    scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(df_rfm[['Recency', 'Frequency', 'Monetary']])
-    
-    # KMeans K=5
-    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-    df_rfm['Cluster'] = kmeans.fit_predict(rfm_scaled)
-    
-    # Naming Segmen (Mapping berdasarkan urutan Monetary)
-    cluster_summary = df_rfm.groupby('Cluster')['Monetary'].mean().reset_index()
-    cluster_summary = cluster_summary.sort_values(by='Monetary', ascending=True).reset_index(drop=True)
-    
-    segment_names = [
-        'Hibernating / Low Value',
-        'New Customer',
-        'Potential Loyalist',
-        'Loyal Customer',
-        'Champion (VIP)'
-    ]
-    
-    cluster_map = {row['Cluster']: segment_names[i] for i, row in cluster_summary.iterrows()}
-    df_rfm['Segment_Name'] = df_rfm['Cluster'].map(cluster_map)
-    
-    df_final = df_sales_clean.merge(df_rfm[['name', 'Segment_Name']], on='name', how='left')
+    # --- NAVIGASI TAB (LAZY) ---
+    # Hanya tab yang aktif yang dihitung & dirender, hasil agregasi di-cache
+    active_tab = st.radio(
+        "Navigasi",
+        [TAB_SUMMARY, TAB_SEGMENT, TAB_STRATEGY],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_tab"
+    )
 
-    # --- TABS VISUALISASI ---
-    tab1, tab2, tab3 = st.tabs(["📊 **Executive Summary**", "👥 **Segmentasi Pelanggan**", "🎯 **Rekomendasi Strategi**"])
-    
     # === TAB 1: EXECUTIVE SUMMARY ===
-    with tab1:
+    if active_tab == TAB_SUMMARY:
         st.subheader(f"Performa Bisnis - {pilihan_bulan}")
+
+        summary = build_summary_view(df_sales_clean, df_ads_clean, pilihan_bulan)
         
         # SCORECARDS
         col1, col2, col3, col4 = st.columns(4)
 
-        total_revenue = df_sales_clean['net_revenue'].sum()
-        total_orders = df_sales_clean['order_id'].nunique()
-        total_purchases_ads = df_ads_clean['Purchases'].sum()
-        conversion_rate = (total_orders / df_rfm.shape[0])
+        total_revenue = summary['total_revenue']
 
         # --- METRIC 1: TOTAL REVENUE (Dinamis) ---
         col1.metric(
@@ -334,21 +670,21 @@ if df_sales_clean is not None:
         # --- METRIC 2: TOTAL ORDER ---
         col2.metric(
             label="**Total Order (Real)**",
-            value=f"{total_orders:,.0f}",
+            value=f"{summary['total_orders']:,.0f}",
             help="Total Order ID unik yang statusnya Completed"
         )
         
         # --- METRIC 3: ADS PURCHASE ---
         col3.metric(
             label="**Total Purchase (Ads Attr.)**",
-            value=f"{total_purchases_ads:,.0f}",
+            value=f"{summary['total_purchases_ads']:,.0f}",
             help="Total konversi Purchase yang tercatat di Dashboard Iklan"
         )
         
         # --- METRIC 4: CONVERSION RATE ---
         col4.metric(
             label="**Conversion Rate (Est)**",
-            value=f"{conversion_rate:.2f} Tx/User",
+            value=f"{summary['conversion_rate']:.2f} Tx/User",
             help="Rata-rata transaksi per user (Total Order / Total User Unik)"
     )
         
@@ -356,14 +692,7 @@ if df_sales_clean is not None:
         
         # GRAFIK TREN HARIAN
         st.subheader("Tren Pendapatan Harian")
-        daily_revenue = df_sales_clean.groupby(df_sales_clean['created_at'].dt.date)['net_revenue'].sum().reset_index()
-        fig_trend, ax_trend = plt.subplots(figsize=(10, 4))
-        sns.lineplot(data=daily_revenue, x='created_at', y='net_revenue', marker='o', ax=ax_trend, color='teal')
-        ax_trend.set_title("Daily Net Revenue")
-        ax_trend.set_xlabel("Tanggal")
-        ax_trend.set_ylabel("Revenue (Rp)")
-        plt.xticks(rotation=45)
-        st.pyplot(fig_trend)
+        st.image(plot_daily_trend(summary['daily_revenue']))
 
         st.markdown("---")
         
@@ -372,25 +701,11 @@ if df_sales_clean is not None:
 
         with col_top1:
             st.subheader("🏆 Top 5 Produk Terlaris")
-            # Hitung Revenue per Produk, ambil 5 teratas
-            top_products = df_sales_clean.groupby('product_clean')['net_revenue'].sum().sort_values(ascending=False).head(5).reset_index()
-            
-            fig_prod, ax_prod = plt.subplots(figsize=(6, 4))
-            sns.barplot(data=top_products, y='product_clean', x='net_revenue', hue='product_clean', legend=False, palette='viridis', ax=ax_prod)
-            ax_prod.set_xlabel("Total Revenue (Rp)")
-            ax_prod.set_ylabel("")
-            st.pyplot(fig_prod)
+            st.image(plot_top_revenue(summary['top_products'], 'product_clean', 'viridis'))
 
         with col_top2:
             st.subheader("📍 Top 5 Kota Pembelian")
-            # Hitung Revenue per Kota, ambil 5 teratas
-            top_cities = df_sales_clean.groupby('city')['net_revenue'].sum().sort_values(ascending=False).head(5).reset_index()
-            
-            fig_city, ax_city = plt.subplots(figsize=(6, 4))
-            sns.barplot(data=top_cities, y='city', x='net_revenue', hue='city', legend=False, palette='magma', ax=ax_city)
-            ax_city.set_xlabel("Total Revenue (Rp)")
-            ax_city.set_ylabel("")
-            st.pyplot(fig_city)
+            st.image(plot_top_revenue(summary['top_cities'], 'city', 'magma'))
         # =========================================================
 
         # FITUR TOP 3 BULANAN (Hanya muncul jika filter Q3)
@@ -398,7 +713,7 @@ if df_sales_clean is not None:
             st.markdown("---")
             st.subheader("📅 Tren Produk Bulanan (Seasonal vs Top Q3)")
             
-            global_top_names = top_products['product_clean'].tolist()
+            global_top_names = summary['global_top_names']
             
             cols_months = st.columns(3)
             months_order = ['JULI', 'AGUSTUS', 'SEPTEMBER']
@@ -407,13 +722,9 @@ if df_sales_clean is not None:
                 with cols_months[i]:
                     st.markdown(f"##### {month}")
                     
-                    # Filter data khusus bulan tersebut
-                    df_month = df_sales_clean[df_sales_clean['source_month'] == month]
+                    top3_month = summary['top3_per_month'].get(month)
                     
-                    if not df_month.empty:
-                        # Cari Top 3 Produk di bulan tersebut
-                        top3_month = df_month.groupby('product_clean')['net_revenue'].sum().sort_values(ascending=False).head(3).reset_index()
-                        
+                    if top3_month is not None:
                         for idx, row in top3_month.iterrows():
                             p_name = row['product_clean']
                             p_rev = row['net_revenue']
@@ -446,56 +757,19 @@ if df_sales_clean is not None:
                         st.info("Tidak ada data.")
 
     # === TAB 2: SEGMENTASI PELANGGAN ===
-    with tab2:
+    elif active_tab == TAB_SEGMENT:
         st.subheader("Analisis Segmentasi RFM (K-Means)")
 
+        df_rfm = compute_rfm_segments(df_sales_clean)
+        segment = build_segment_view(df_rfm)
+
         col_seg1, col_seg2 = st.columns([1, 2])
         
         with col_seg1:
-            # Hitung Jumlah Customer per Segmen
-            seg_counts = df_rfm['Segment_Name'].value_counts().reset_index()
-            seg_counts.columns = ['Segment_Name', 'Jumlah Customer']
-
-            df_segment_view = seg_counts[['Segment_Name', 'Jumlah Customer']].copy()
-            
-            df_segment_view = df_segment_view.rename(columns={
-                'Segment_Name': 'Segmen Pelanggan',
-                'Jumlah Customer': 'Total User'
-            })
-
             st.markdown("##### Disribusi Segmen")
-            st.table(df_segment_view.set_index('Segmen Pelanggan'))
-            
-            # Horizontal Bar Chart
-            total_cust = seg_counts['Jumlah Customer'].sum()
-            seg_counts['Persentase'] = (seg_counts['Jumlah Customer'] / total_cust) * 100
-            seg_counts['Label'] = seg_counts.apply(lambda x: f"{x['Segment_Name']} ({x['Persentase']:.1f}%)", axis=1)
+            st.table(segment['df_segment_view'].set_index('Segmen Pelanggan'))
             
-            fig_bar_seg, ax_bar_seg = plt.subplots(figsize=(6, 4))
-            fig_bar_seg.patch.set_alpha(0)
-            ax_bar_seg.patch.set_alpha(0)
-            
-            # Plot Bar Chart Horizontal
-            sns.barplot(
-                data=seg_counts, 
-                y='Label',         
-                x='Jumlah Customer', 
-                hue='Label',
-                legend=False,
-                palette='viridis',  
-                ax=ax_bar_seg
-            )
-            
-            for container in ax_bar_seg.containers:
-                ax_bar_seg.bar_label(container, padding=5, fmt='%d User', color='#333333')
-            
-            # Bersihkan chart junk
-            sns.despine(left=True, bottom=True)
-            ax_bar_seg.set_xlabel("")
-            ax_bar_seg.set_ylabel("")
-            ax_bar_seg.set_xticks([])
-            
-            st.pyplot(fig_bar_seg)
+            st.image(plot_segment_distribution(segment['seg_counts']))
             
         with col_seg2:
             st.markdown("##### Peta Persebaran Pelanggan")
@@ -508,30 +782,7 @@ if df_sales_clean is not None:
                 """
             )
 
-            fig_scatter, ax_scatter = plt.subplots(figsize=(8, 6))
-            fig_scatter.patch.set_alpha(0)
-            ax_scatter.patch.set_alpha(0)
-            ax_scatter.tick_params(colors='#888888')
-            ax_scatter.xaxis.label.set_color('#888888')
-            ax_scatter.yaxis.label.set_color('#888888')
-            ax_scatter.title.set_color('#888888')
-            
-            # Scatter Plot
-            sns.scatterplot(
-                data=df_rfm, 
-                x='Recency', 
-                y='Monetary', 
-                hue='Segment_Name', 
-                palette='viridis', 
-                s=100, 
-                ax=ax_scatter
-            )
-            
-            ax_scatter.set_title("") 
-            ax_scatter.set_xlabel("Recency (Hari)")
-            ax_scatter.set_ylabel("Monetary (Rp)")
-            
-            st.pyplot(fig_scatter)
+            st.image(plot_segment_scatter(df_rfm))
 
         st.markdown("---")
         st.subheader("Analisis Nilai & Loyalitas Segmen")
@@ -541,120 +792,73 @@ if df_sales_clean is not None:
         # --- REVENUE PER SEGMENT ---
         with col_deep1:
             st.markdown("##### 💸 Total Kontribusi Revenue per Segmen")
-            
-            rev_per_seg = df_rfm.groupby('Segment_Name')['Monetary'].sum().sort_values(ascending=False).reset_index()
-            
-            fig_rev, ax_rev = plt.subplots(figsize=(6, 4))
-            sns.barplot(
-                data=rev_per_seg,
-                y='Segment_Name',
-                x='Monetary',
-                hue='Segment_Name',
-                legend=False,
-                palette='Blues_r',
-                ax=ax_rev
-            )
-            
-            ax_rev.set_xlabel("Total Revenue")
-            ax_rev.set_ylabel("")
-            sns.despine(left=True, bottom=False)
-            
-            def currency_fmt(x, pos):
-                return format_big_number(x)
-            
-            ax_rev.xaxis.set_major_formatter(ticker.FuncFormatter(currency_fmt))
-            
-            st.pyplot(fig_rev)
+            st.image(plot_segment_revenue(segment['rev_per_seg']))
             
             # Insight Text
-            top_seg_rev = rev_per_seg.iloc[0]['Segment_Name']
-            st.caption(f"💡 Segmen **{top_seg_rev}** adalah penyumbang omzet terbesar bagi perusahaan.")
+            st.caption(f"💡 Segmen **{segment['top_seg_rev']}** adalah penyumbang omzet terbesar bagi perusahaan.")
 
         # --- REPEAT RATE PER SEGMENT ---
         with col_deep2:
             st.markdown("##### 🔄 Tingkat Repeat Order (%) per Segmen")
-            
-            # 1. Hitung Repeat Rate (Frequency > 1) - Metode Vectorized
-            total_users = df_rfm.groupby('Segment_Name')['name'].count()
-            repeat_users = df_rfm[df_rfm['Frequency'] > 1].groupby('Segment_Name')['name'].count()
-            
-            repeat_users = repeat_users.reindex(total_users.index, fill_value=0)
-            
-            repeat_rate_series = (repeat_users / total_users) * 100
-            repeat_data = repeat_rate_series.reset_index(name='Repeat_Rate').sort_values(by='Repeat_Rate', ascending=False)
-            
-            fig_rep, ax_rep = plt.subplots(figsize=(6, 4))
-            sns.barplot(
-                data=repeat_data,
-                y='Segment_Name',
-                x='Repeat_Rate',
-                hue='Segment_Name',
-                legend=False,
-                palette='Greens_r',
-                ax=ax_rep
-            )
-            
-            for container in ax_rep.containers:
-                ax_rep.bar_label(container, fmt='%.1f%%', padding=3, fontsize=10)
-                
-            ax_rep.set_xlabel("Persentase Repeat Order (%)")
-            ax_rep.set_ylabel("")
-            ax_rep.set_xlim(0, 115)
-            sns.despine(left=True, bottom=False)
-            
-            st.pyplot(fig_rep)
+            st.image(plot_repeat_rate(segment['repeat_data']))
             
             st.caption("💡 Menunjukkan persentase pelanggan di setiap segmen yang sudah belanja lebih dari 1 kali.")
 
+        # FITUR MIGRASI SEGMEN (Hanya muncul jika filter Q3)
+        if pilihan_bulan == "Semua Data (Q3)":
+            st.markdown("---")
+            st.subheader("🔀 Migrasi Segmen Antar Bulan")
+
+            transitions = compute_segment_transitions(df_sales_clean, all_months)
+
+            if transitions:
+                transition_options = list(transitions.keys())
+                saved_transisi = st.session_state.get('saved_transition_pair')
+                pilihan_transisi = st.selectbox(
+                    "Pilih Periode Transisi:",
+                    transition_options,
+                    index=transition_options.index(saved_transisi) if saved_transisi in transition_options else 0,
+                    format_func=lambda pair: f"{pair[0]} ➜ {pair[1]}",
+                    key='transition_pair',
+                    on_change=persist_widget,
+                    args=('transition_pair',)
+                )
+                matrix = transitions[pilihan_transisi]
+
+                st.image(plot_transition_heatmap(matrix, *pilihan_transisi))
+
+                with st.expander("Lihat Tabel Transisi (%)"):
+                    # Persentase per baris: ke mana pelanggan dari tiap segmen berpindah
+                    matrix_pct = matrix.div(matrix.sum(axis=1).replace(0, np.nan), axis=0) * 100
+                    st.table(matrix_pct.fillna(0).round(1))
+
+                st.caption(
+                    f"💡 Segmen migrasi dihitung dari RFM per bulan dengan centroid K-Means yang sama untuk semua bulan, "
+                    f"sehingga **berbeda** dari segmen Q3 pada grafik di atas meski namanya sama. "
+                    f"'{INACTIVE_SEGMENT}' = tidak ada transaksi di bulan tersebut."
+                )
+            else:
+                st.info("Data tidak cukup untuk menghitung migrasi segmen.")
+
     # === TAB 3: STRATEGI BISNIS ===
-    with tab3:
+    elif active_tab == TAB_STRATEGY:
         st.subheader("Rekomendasi Strategi Bisnis")
         
         # --- GENERATE STRATEGY LOGIC ---
-        # 1. Profiling Segmen
-        segment_counts_rfm = df_rfm['Segment_Name'].value_counts().reset_index()
-        segment_counts_rfm.columns = ['Segment_Name', 'Jumlah_Pelanggan']
-        
-        segment_profile = df_final.groupby('Segment_Name').agg({
-            'city': lambda x: get_mode(x),
-            'province': lambda x: get_mode(x),
-            'product_clean': lambda x: get_mode(x),
-            'net_revenue': 'mean'
-        }).reset_index()
-        
-        segment_profile = segment_profile.merge(segment_counts_rfm, on='Segment_Name')
-        
-        # 2. Cross-Match Ads Data
-        segment_profile['Target_Age_Ads'] = segment_profile['product_clean'].apply(
-            lambda x: get_ads_insight(x, df_ads_clean)
-        )
-        
-        # 3. Generate Strategy
-        def generate_strategy(row):
-            segmen = row['Segment_Name']
-            produk = row['product_clean']
-            kota = row['city']
-            umur = row['Target_Age_Ads']
-            
-            if "Champion" in segmen or ("Loyal" in segmen and "Potential" not in segmen):
-                return f"RETENTION & EXCLUSIVE UPSELLING: Tawarkan 'Exclusive Bundle' {produk}. Targetkan area {kota} (Umur {umur}). Fokus jaga loyalitas."
-            elif "Potential" in segmen:
-                return f"CROSS-SELLING: Tawarkan varian lain/paket bundling {produk} ke pelanggan di {kota}. Targetkan audiens {umur} untuk meningkatkan Frekuensi & Nilai Transaksi."
-            elif "New" in segmen:
-                return f"ACTIVATION: Dorong pembelian ke-2 (Repeat Order) untuk {produk}. Gunakan iklan testimoni di {kota} (Target {umur}). Fokus mendorong pembelian ulang."
-            elif "Hibernating" in segmen or "Low" in segmen:
-                return f"WIN-BACK (EFFICIENT): Beri diskon 'Hard Offer' waktu terbatas untuk {produk}. Fokus area {kota} saja untuk menghemat anggaran dan hentikan jika tidak memberikan dampak positif."
-            else:
-                return f"GENERAL: Optimalkan iklan {produk} di {kota}."
-
-        segment_profile['Strategi_Bisnis'] = segment_profile.apply(generate_strategy, axis=1)
+        df_rfm = compute_rfm_segments(df_sales_clean)
+        segment_profile = build_strategy_view(df_sales_clean, df_ads_clean, df_rfm)
         
         # --- DISPLAY OUTPUT ---
         # Filter Pilihan Segmen
+        segment_options = list(segment_profile['Segment_Name'].unique())
+        saved_segmen = st.session_state.get('saved_strategy_segments', segment_options)
         pilihan_segmen_view = st.multiselect(
             "Filter Segmen untuk Dilihat:", 
-            segment_profile['Segment_Name'].unique(),
-            default=segment_profile['Segment_Name'].unique()
+            segment_options,
+            default=[seg for seg in saved_segmen if seg in segment_options],
+            key='strategy_segments',
+            on_change=persist_widget,
+            args=('strategy_segments',)
         )
         
         df_display_strategy = segment_profile[segment_profile['Segment_Name'].isin(pilihan_segmen_view)]